@@ -1,13 +1,56 @@
+import asyncio
+import codecs
+import os
+import pickle
+import re
+import stat
+import tempfile
 import time
-from datetime import date, datetime
-from typing import Optional, Dict, Any, List
-import xml.etree.ElementTree as ET
-
-import requests
+from collections import defaultdict
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import date
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+import httpx
+import numpy as np
+import orjson
 from fastapi import FastAPI, Query
-from fastapi.responses import JSONResponse
-
-app = FastAPI(title="NFQS 친환경수산물 인증 조회 API", version="1.0.0")
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, Field
+
+try:
+    from lxml import etree as LET
+except ImportError:  # lxml이 없으면 parse_items가 바이트 스캐너로 대체
+    LET = None
+
+try:
+    from numba import njit
+except ImportError:  # numba가 없으면 NumPy/순수 파이썬 경로만 사용
+    njit = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global CLIENT
+    # 같은 프로세스에서 앱이 다시 시작되면(이전 종료 때 닫힌) 클라이언트를 새로 만듦
+    if CLIENT.is_closed:
+        CLIENT = _new_client()
+    yield
+    # 종료 시 원본 API용 커넥션 풀 정리
+    await CLIENT.aclose()
+
+
+app = FastAPI(
+    title="NFQS 친환경수산물 인증 조회 API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+# /api/search 응답은 수백 KB가 될 수 있어 gzip으로 전송 바이트를 줄임
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 # =========================
 # 설정
@@ -17,12 +60,65 @@ CERT_KEY = "389CE834F4BEABF2200E4E8C77EA9A76E1FD9C4619227A4882BE128DA0A6A1F8"
 
 HTTP_TIMEOUT = 20
 CACHE_TTL_SECONDS = 60
-_cache = {"ts": 0.0, "items": []}
+# 서버리스 인스턴스가 재시작돼도 남은 캐시 스냅샷을 재사용.
+# 기본은 임시 디렉터리 아래 사용자 전용(0700) 디렉터리이고 NFQS_CACHE_DIR로 바꿀 수 있음
+CACHE_DIR = os.environ.get("NFQS_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), f"nfqs-cache-{os.getuid()}" if hasattr(os, "getuid") else "nfqs-cache"
+)
+CACHE_FILE = os.path.join(CACHE_DIR, "cache.pkl")
+SNAPSHOT_MAX_AGE_SECONDS = CACHE_TTL_SECONDS * 10
+MAX_BATCH_CERTNOS = 500
+# 이보다 행이 많을 때만 numba 커널 사용(JIT 컴파일/호출 비용 때문에 작은 N은 파이썬이 더 빠름)
+NUMBA_MIN_ROWS = 5000
+
+
+# 웜 인스턴스에서는 TCP/TLS 연결을 재사용(keep-alive) + gzip 전송
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        headers={"Accept-Encoding": "gzip, deflate", "User-Agent": "nfqs-api/1.0"},
+        limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+    )
+
+
+CLIENT = _new_client()
+
+# items와 나란히 쓰는 컬럼(SoA): 캐시 갱신 시 한 번만 계산
+# vfrom_i/vto_i: YYYYMMDD를 int32로 packing (미기재/파싱불가는 0)
+# by_certno: certno(strip) -> items 인덱스 목록 (vdatefrom 최신 우선)
+_cache = {
+    "ts": 0.0,
+    "items": [],
+    "haystacks": [],
+    "jisok_lc": [],
+    "vfrom_i": np.zeros(0, dtype=np.int32),
+    "vto_i": np.zeros(0, dtype=np.int32),
+    "by_certno": {},
+}
+# 캐시 미스 시 원본 호출은 한 요청만(single-flight), 나머지는 대기 후 갱신된 캐시 사용
+_refresh_lock = asyncio.Lock()
+
+ITEM_FIELDS = (
+    "jisoknm", "codeknm", "goodknm", "certno", "custkfirm", "headknm",
+    "resino", "tel", "jisokaddr", "vdatefrom", "vdateto",
+)
+
+# 필드 XPath는 모듈 로드 시 한 번만 컴파일
+_F = {name: LET.XPath(f"{name}/text()") for name in ITEM_FIELDS} if LET is not None else {}
+
+# 바이트 스캐너용 태그
+_ITEM_OPEN, _ITEM_CLOSE = b"<item>", b"</item>"
+_FIELD_TAGS = [(name, f"<{name}>".encode(), f"</{name}>".encode()) for name in ITEM_FIELDS]
+_XML_DECL_ENCODING = re.compile(rb"""^\s*<\?xml[^>]*?\sencoding\s*=\s*["']([A-Za-z][A-Za-z0-9._-]*)["']""")
+# XML이 정의한 5개 엔티티와 숫자 문자 참조만 해제(lxml과 동일하게 &copy; 같은 HTML 엔티티는 그대로)
+_XML_ENTITY = re.compile(r"&(#x[0-9A-Fa-f]+|#[0-9]+|lt|gt|amp|quot|apos);")
+_XML_ENTITY_CHARS = {"lt": "<", "gt": ">", "amp": "&", "quot": '"', "apos": "'"}
 
 
 # =========================
 # 유틸
 # =========================
+@lru_cache(maxsize=4096)
 def yyyymmdd_to_date(s: str) -> Optional[date]:
     if not s:
         return None
@@ -30,7 +126,7 @@ def yyyymmdd_to_date(s: str) -> Optional[date]:
     if len(s) != 8 or not s.isdigit():
         return None
     try:
-        return datetime.strptime(s, "%Y%m%d").date()
+        return date(int(s[:4]), int(s[4:6]), int(s[6:8]))
     except ValueError:
         return None
 
@@ -44,210 +140,619 @@ def validity_status(vfrom: str, vto: str, today: Optional[date] = None) -> str:
     """
     if today is None:
         today = date.today()
+    return _validity_cached(vfrom, vto, today.toordinal())
 
+
+@lru_cache(maxsize=8192)
+def _validity_cached(vfrom: str, vto: str, today_ord: int) -> str:
     d_from = yyyymmdd_to_date(vfrom)
     d_to = yyyymmdd_to_date(vto)
 
     if not d_from or not d_to:
         return "UNKNOWN"
-    if today < d_from:
+    if today_ord < d_from.toordinal():
         return "FUTURE"
-    if today > d_to:
+    if today_ord > d_to.toordinal():
         return "EXPIRED"
     return "VALID"
 
 
+def _parse_yyyymmdd_int(s: str) -> int:
+    # 달력상 유효한 날짜만 packing 해야 정수 비교가 날짜 비교와 같아짐
+    d = yyyymmdd_to_date(s)
+    return d.year * 10000 + d.month * 100 + d.day if d else 0
+
+
+# 상태 코드(uint8) -> 라벨
+VALIDITY_LABELS = np.array(["VALID", "UNKNOWN", "EXPIRED", "FUTURE"])
+ST_VALID, ST_UNKNOWN, ST_EXPIRED, ST_FUTURE = 0, 1, 2, 3
+
+
+def validity_codes(vfrom: np.ndarray, vto: np.ndarray, today: date) -> np.ndarray:
+    """
+    validity_status의 벡터 버전. 뒤에 대입한 것이 우선: UNKNOWN > FUTURE > EXPIRED
+    """
+    today_i = today.year * 10000 + today.month * 100 + today.day
+    if njit is not None and len(vfrom) >= NUMBA_MIN_ROWS:
+        codes = np.empty(len(vfrom), dtype=np.uint8)
+        _classify_kernel(vfrom, vto, today_i, codes)
+        return codes
+
+    codes = np.full(len(vfrom), ST_VALID, dtype=np.uint8)
+    codes[today_i > vto] = ST_EXPIRED
+    codes[today_i < vfrom] = ST_FUTURE
+    codes[(vfrom == 0) | (vto == 0)] = ST_UNKNOWN
+    return codes
+
+
+def build_hay_blob(haystacks: List[str]):
+    encoded = [h.encode("utf-8") for h in haystacks]
+    offs = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offs[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offs
+
+
+# numba 경로에서 처음 쓸 때만 만드는 haystacks 연결본(캐시 갱신 단위로 하나만 유지, 스냅샷에는 안 넣음)
+# _refresh_cache 가 _cache 를 교체할 때 비워서 이전 세대 haystacks/blob 을 붙잡지 않게 함
+_hay_blob_memo: Dict[str, Any] = {"src": None, "blob": None, "offs": None}
+
+
+def _hay_blob_for(haystacks: List[str]):
+    if _hay_blob_memo["src"] is not haystacks:
+        blob, offs = build_hay_blob(haystacks)
+        _hay_blob_memo.update({"src": haystacks, "blob": blob, "offs": offs})
+    return _hay_blob_memo["blob"], _hay_blob_memo["offs"]
+
+
+def filter_contains(raw: Dict[str, Any], indices, tokens: List[str]) -> List[int]:
+    """
+    haystacks[i]에 tokens가 모두 들어 있는 i만 남김(오름차순 유지).
+    단어 하나는 str의 C 구현 부분검색이 더 빨라 항상 파이썬 경로, 여러 단어 AND만 numba 사용.
+    UTF-8은 자기 동기화 인코딩이라 바이트 부분일치가 곧 문자열 부분일치.
+    """
+    haystacks: List[str] = raw["haystacks"]
+    if len(tokens) == 1:
+        k = tokens[0]
+        return [i for i in indices if k in haystacks[i]]
+    if njit is None or len(indices) < NUMBA_MIN_ROWS:
+        return [i for i in indices if all(t in haystacks[i] for t in tokens)]
+
+    blob, offs = _hay_blob_for(haystacks)
+    mask = np.zeros(len(haystacks), dtype=np.bool_)
+    mask[np.fromiter(indices, dtype=np.intp, count=len(indices))] = True
+    for t in tokens:
+        _contains_kernel(blob, offs, np.frombuffer(t.encode("utf-8"), dtype=np.uint8), mask)
+    return np.flatnonzero(mask).tolist()
+
+
+def _jit(fn):
+    # 컴파일 결과를 디스크에 캐시해서 프로세스마다 JIT 비용을 내지 않도록 함
+    try:
+        return njit(cache=True)(fn)
+    except RuntimeError:  # 캐시를 쓸 수 있는 위치가 없으면 캐시 없이
+        return njit(fn)
+
+
+if njit is not None:
+    @_jit
+    def _classify_kernel(vfrom, vto, today_i, out):
+        # validity_codes와 같은 우선순위: UNKNOWN > FUTURE > EXPIRED
+        for i in range(vfrom.shape[0]):
+            if vfrom[i] == 0 or vto[i] == 0:
+                out[i] = ST_UNKNOWN
+            elif today_i < vfrom[i]:
+                out[i] = ST_FUTURE
+            elif today_i > vto[i]:
+                out[i] = ST_EXPIRED
+            else:
+                out[i] = ST_VALID
+
+    @_jit
+    def _contains_kernel(blob, offs, needle, mask):
+        # mask[i]가 True인 행만 검사해서 needle이 없으면 False로 바꿈
+        m = needle.shape[0]
+        for i in range(mask.shape[0]):
+            if not mask[i]:
+                continue
+            end = offs[i + 1]
+            found = False
+            j = offs[i]
+            while j + m <= end:
+                if blob[j] == needle[0]:
+                    k = 1
+                    while k < m and blob[j + k] == needle[k]:
+                        k += 1
+                    if k == m:
+                        found = True
+                        break
+                j += 1
+            mask[i] = found
+
+
+@lru_cache(maxsize=8192)
 def format_date_iso(s: str) -> str:
     d = yyyymmdd_to_date(s)
     return d.isoformat() if d else (s or "")
 
 
-def build_haystack(it: Dict[str, Any]) -> str:
+def build_haystack(it: "Item") -> str:
     return " ".join([
-        it.get("jisoknm", ""),
-        it.get("codeknm", ""),
-        it.get("goodknm", ""),
-        it.get("certno", ""),
-        it.get("custkfirm", ""),
-        it.get("headknm", ""),
-        it.get("jisokaddr", ""),
-        it.get("tel", ""),
+        it.jisoknm,
+        it.codeknm,
+        it.goodknm,
+        it.certno,
+        it.custkfirm,
+        it.headknm,
+        it.jisokaddr,
+        it.tel,
     ]).lower()
 
 
+# =========================
+# 캐시 항목
+# =========================
+@dataclass(slots=True)
+class Item:
+    """
+    원본 item 한 건. 필드 순서는 ITEM_FIELDS와 같고, 응답용 ISO 날짜는 생성 시 한 번만 계산.
+    """
+    jisoknm: str
+    codeknm: str
+    goodknm: str
+    certno: str
+    custkfirm: str
+    headknm: str
+    resino: str
+    tel: str
+    jisokaddr: str
+    vdatefrom: str
+    vdateto: str
+    vdatefrom_iso: str = field(init=False)
+    vdateto_iso: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.vdatefrom_iso = format_date_iso(self.vdatefrom)
+        self.vdateto_iso = format_date_iso(self.vdateto)
+
+    def to_dict(self, validity: str) -> Dict[str, str]:
+        # _validity는 날짜에 따라 달라지므로 응답 만들 때 받음
+        return {
+            "jisoknm": self.jisoknm,
+            "codeknm": self.codeknm,
+            "goodknm": self.goodknm,
+            "certno": self.certno,
+            "custkfirm": self.custkfirm,
+            "headknm": self.headknm,
+            "resino": self.resino,
+            "tel": self.tel,
+            "jisokaddr": self.jisokaddr,
+            "vdatefrom": self.vdatefrom,
+            "vdateto": self.vdateto,
+            "_validity": validity,
+            "vdatefrom_iso": self.vdatefrom_iso,
+            "vdateto_iso": self.vdateto_iso,
+        }
+
+
 # =========================
 # 원본 API 호출 + XML 파싱
 # =========================
-def fetch_xml() -> str:
-    r = requests.get(API_URL, params={"cert_key": CERT_KEY}, timeout=HTTP_TIMEOUT)
-    r.raise_for_status()
-    return r.text
-
-
-def parse_items(xml_text: str) -> Dict[str, Any]:
-    root = ET.fromstring(xml_text)
-    result_code = (root.findtext("./header/resultCode") or "").strip()
-    result_msg = (root.findtext("./header/resultMsg") or "").strip()
-
-    items: List[Dict[str, Any]] = []
-    for it in root.findall(".//body/items/item"):
-        items.append({
-            "jisoknm": it.findtext("jisoknm") or "",
-            "codeknm": it.findtext("codeknm") or "",
-            "goodknm": it.findtext("goodknm") or "",
-            "certno": it.findtext("certno") or "",
-            "custkfirm": it.findtext("custkfirm") or "",
-            "headknm": it.findtext("headknm") or "",
-            "resino": it.findtext("resino") or "",
-            "tel": it.findtext("tel") or "",
-            "jisokaddr": it.findtext("jisokaddr") or "",
-            "vdatefrom": it.findtext("vdatefrom") or "",
-            "vdateto": it.findtext("vdateto") or "",
-        })
+async def fetch_xml() -> AsyncIterator[bytes]:
+    global CLIENT
+    # lifespan 밖에서(종료 후) 호출돼도 닫힌 클라이언트를 쓰지 않도록
+    if CLIENT.is_closed:
+        CLIENT = _new_client()
+    # 본문을 통째로 받지 않고 (gzip 해제된) 청크 단위로 넘김
+    async with CLIENT.stream("GET", API_URL, params={"cert_key": CERT_KEY}) as r:
+        r.raise_for_status()
+        async for chunk in r.aiter_bytes():
+            yield chunk
+
+
+def _xml_encoding(data: bytes) -> str:
+    # XML 선언의 encoding을 따르고, 없거나 모르는 이름이면 XML 기본값인 UTF-8
+    m = _XML_DECL_ENCODING.match(data, 0, 200)
+    if m:
+        try:
+            return codecs.lookup(m.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def _xml_entity_sub(m: "re.Match[str]") -> str:
+    ref = m.group(1)
+    if ref[0] != "#":
+        return _XML_ENTITY_CHARS[ref]
+    try:
+        return chr(int(ref[2:], 16) if ref[1] in "xX" else int(ref[1:]))
+    except (ValueError, OverflowError):
+        return m.group(0)
+
+
+def _scan_text(data: bytes, open_tag: bytes, close_tag: bytes, start: int, end: int, encoding: str) -> str:
+    s = data.find(open_tag, start, end)
+    if s < 0:
+        return ""
+    s += len(open_tag)
+    e = data.find(close_tag, s, end)
+    if e < 0:
+        return ""
+    v = data[s:e].decode(encoding)
+    if v.startswith("<![CDATA[") and v.endswith("]]>"):
+        return v[9:-3]
+    return _XML_ENTITY.sub(_xml_entity_sub, v) if "&" in v else v
+
+
+def scan_items(data: bytes) -> Dict[str, Any]:
+    """
+    lxml이 없을 때 쓰는 바이트 스캐너. 원본 스키마가 평평하고 고정(item 아래 11개 태그)이라
+    태그 위치만 bytes.find로 찾아 값을 잘라낸다. 태그가 ASCII로 인코딩되는 문자셋
+    (UTF-8, EUC-KR 등)만 가정하며 속성/중첩 태그는 지원하지 않음.
+    """
+    n = len(data)
+    encoding = _xml_encoding(data)
+    header_end = data.find(_ITEM_OPEN)
+    if header_end < 0:
+        header_end = n
+    result_code = _scan_text(data, b"<resultCode>", b"</resultCode>", 0, header_end, encoding).strip()
+    result_msg = _scan_text(data, b"<resultMsg>", b"</resultMsg>", 0, header_end, encoding).strip()
+
+    items: List[Item] = []
+    i = data.find(_ITEM_OPEN)
+    while i >= 0:
+        body_start = i + len(_ITEM_OPEN)
+        body_end = data.find(_ITEM_CLOSE, body_start)
+        if body_end < 0:
+            break
+        items.append(Item(*[
+            _scan_text(data, open_tag, close_tag, body_start, body_end, encoding)
+            for _, open_tag, close_tag in _FIELD_TAGS
+        ]))
+        i = data.find(_ITEM_OPEN, body_end + len(_ITEM_CLOSE))
 
     return {"resultCode": result_code, "resultMsg": result_msg, "items": items}
 
 
-def get_items_cached(force: bool = False) -> Dict[str, Any]:
-    now = time.time()
-    if (not force) and _cache["items"] and (now - _cache["ts"] < CACHE_TTL_SECONDS):
-        return {"resultCode": "00", "resultMsg": "CACHED", "items": _cache["items"]}
+def _collect_events(parser, header: Dict[str, str], items: List[Item]) -> None:
+    for _, elem in parser.read_events():
+        if elem.tag == "item":
+            items.append(Item(*[str((_F[name](elem) or [""])[0]) for name in ITEM_FIELDS]))
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        else:
+            header[elem.tag] = (elem.text or "").strip()
 
-    parsed = parse_items(fetch_xml())
-    if parsed.get("resultCode") != "00":
-        return parsed
 
-    _cache["ts"] = now
-    _cache["items"] = parsed["items"]
-    return parsed
+async def parse_items(chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+    """
+    청크가 도착하는 대로 XMLPullParser에 넣어 스트리밍 파싱: item 하나를 dict로 옮긴 뒤
+    바로 clear 해서 전체 DOM을 메모리에 들고 있지 않도록 한다.
+    """
+    if LET is None:
+        return scan_items(b"".join([chunk async for chunk in chunks]))
 
+    header: Dict[str, str] = {"resultCode": "", "resultMsg": ""}
+    items: List[Item] = []
 
-def compute_counts(items: List[Dict[str, Any]]) -> Dict[str, int]:
-    today = date.today()
-    counts = {"VALID": 0, "UNKNOWN": 0, "EXPIRED": 0, "FUTURE": 0}
-    for it in items:
-        st = validity_status(it.get("vdatefrom", ""), it.get("vdateto", ""), today=today)
-        counts[st] += 1
+    parser = LET.XMLPullParser(events=("end",), tag=("resultCode", "resultMsg", "item"))
+    async for chunk in chunks:
+        parser.feed(chunk)
+        _collect_events(parser, header, items)
+    parser.close()
+    _collect_events(parser, header, items)
+
+    return {"resultCode": header["resultCode"], "resultMsg": header["resultMsg"], "items": items}
+
+
+def _cached_view(result_msg: str) -> Dict[str, Any]:
+    # 갱신 중인 캐시와 섞이지 않도록 한 번에 복사한 스냅샷에서 꺼냄
+    snap = dict(_cache)
     return {
-        "rows_total": len(items),
-        "rows_valid": counts["VALID"],
-        "rows_unknown": counts["UNKNOWN"],
-        "rows_expired": counts["EXPIRED"],
-        "rows_future": counts["FUTURE"],
+        "resultCode": "00",
+        "resultMsg": result_msg,
+        "items": snap["items"],
+        "haystacks": snap["haystacks"],
+        "jisok_lc": snap["jisok_lc"],
+        "vfrom_i": snap["vfrom_i"],
+        "vto_i": snap["vto_i"],
+        "by_certno": snap["by_certno"],
     }
 
 
+def build_certno_index(items: List[Item], vfrom: np.ndarray) -> Dict[str, List[int]]:
+    groups: Dict[str, List[int]] = defaultdict(list)
+    for i, it in enumerate(items):
+        groups[it.certno.strip()].append(i)
+    # 안정 정렬이라 vdatefrom이 같으면 원본 순서 유지
+    return {cno: sorted(idxs, key=lambda i: -int(vfrom[i])) for cno, idxs in groups.items()}
+
+
+def _private_cache_dir() -> Optional[str]:
+    """
+    스냅샷은 pickle이라 다른 사용자가 만든 파일을 읽으면 코드 실행이 가능함.
+    현재 사용자 소유이고 그룹/기타 권한이 없는 디렉터리일 때만 사용.
+    """
+    if not hasattr(os, "getuid"):
+        return None
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        st = os.lstat(CACHE_DIR)
+    except OSError:
+        return None
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        return None
+    return CACHE_DIR
+
+
+def _save_snapshot() -> None:
+    cache_dir = _private_cache_dir()
+    if cache_dir is None:
+        return
+    try:
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")  # 0600으로 생성
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(dict(_cache), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, CACHE_FILE)
+    except Exception:
+        # 스냅샷은 최적화일 뿐이라 (피클링 오류 포함) 어떤 실패도 요청으로 올리지 않고
+        # 임시 파일만 정리
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _load_snapshot() -> None:
+    if _private_cache_dir() is None:
+        return
+    try:
+        fd = os.open(CACHE_FILE, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    except OSError:
+        return
+    with os.fdopen(fd, "rb") as f:
+        st = os.fstat(f.fileno())
+        if not stat.S_ISREG(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o022:
+            return
+        try:
+            snap = pickle.load(f)
+        except Exception:
+            return
+    # 캐시 구조가 바뀐 배포의 스냅샷이거나 너무 오래된 스냅샷은 버림
+    if not isinstance(snap, dict) or set(snap) != set(_cache):
+        return
+    if time.time() - snap["ts"] >= SNAPSHOT_MAX_AGE_SECONDS:
+        return
+    # 로드 시점부터 TTL 동안은 원본 호출 없이 스냅샷으로 응답
+    _cache.update(snap, ts=time.time())
+
+
+def _is_fresh(now: float) -> bool:
+    return bool(_cache["items"]) and (now - _cache["ts"] < CACHE_TTL_SECONDS)
+
+
+async def get_items_cached(force: bool = False) -> Dict[str, Any]:
+    requested_at = time.time()
+    if (not force) and _is_fresh(requested_at):
+        return _cached_view("CACHED")
+
+    async with _refresh_lock:
+        # 대기하는 동안 다른 요청이 이미 갱신했으면 그 결과를 사용(force 포함)
+        if _cache["ts"] >= requested_at or ((not force) and _is_fresh(time.time())):
+            return _cached_view("CACHED")
+        return await _refresh_cache()
+
+
+async def _refresh_cache() -> Dict[str, Any]:
+    now = time.time()
+    # 파싱 중 예외가 나도 응답 스트림(연결)은 정리되도록 aclosing
+    async with aclosing(fetch_xml()) as chunks:
+        parsed = await parse_items(chunks)
+    if parsed.get("resultCode") != "00":
+        return parsed
+
+    items = parsed["items"]
+    vfrom_i = np.fromiter(
+        (_parse_yyyymmdd_int(it.vdatefrom) for it in items), dtype=np.int32, count=len(items)
+    )
+    vto_i = np.fromiter(
+        (_parse_yyyymmdd_int(it.vdateto) for it in items), dtype=np.int32, count=len(items)
+    )
+    # 컬럼을 모두 만든 뒤 한 번에 교체
+    _cache.update({
+        "ts": now,
+        "items": items,
+        "haystacks": [build_haystack(it) for it in items],
+        "jisok_lc": [it.jisoknm.lower() for it in items],
+        "vfrom_i": vfrom_i,
+        "vto_i": vto_i,
+        "by_certno": build_certno_index(items, vfrom_i),
+    })
+    _hay_blob_memo.update({"src": None, "blob": None, "offs": None})
+    _save_snapshot()
+    return _cached_view(parsed.get("resultMsg", ""))
+
+
+def compute_counts(codes: np.ndarray) -> Dict[str, int]:
+    bc = np.bincount(codes, minlength=4)
+    return {
+        "rows_total": len(codes),
+        "rows_valid": int(bc[ST_VALID]),
+        "rows_unknown": int(bc[ST_UNKNOWN]),
+        "rows_expired": int(bc[ST_EXPIRED]),
+        "rows_future": int(bc[ST_FUTURE]),
+    }
+
+
+_load_snapshot()
+
+
 # =========================
 # 엔드포인트
 # =========================
+# 결과가 없는 응답은 구조가 고정이라 미리 인코딩한 bytes에 값만 끼워 넣음
+_SEARCH_ERROR_TMPL = (
+    b'{"resultCode":%b,"resultMsg":%b,"today":"%b",'
+    b'"counts":{"rows_total":0,"rows_valid":0,"rows_unknown":0,"rows_expired":0,"rows_future":0},'
+    b'"items":[]}'
+)
+_EXPIRY_ERROR_TMPL = b'{"resultCode":%b,"resultMsg":%b,"today":"%b","found":false,"item":null}'
+_EXPIRY_NOT_FOUND_TMPL = b'{"resultCode":"00","resultMsg":"OK","today":"%b","found":false,"item":null}'
+_EXPIRY_BATCH_ERROR_TMPL = b'{"resultCode":%b,"resultMsg":%b,"today":"%b","results":[]}'
+
+
+def _template_response(tmpl: bytes, raw: Optional[Dict[str, Any]], today_iso: str) -> Response:
+    # 원본 resultCode/resultMsg는 임의 문자열이라 orjson으로 JSON 이스케이프
+    if raw is None:
+        content = tmpl % (today_iso.encode(),)
+    else:
+        content = tmpl % (
+            orjson.dumps(raw.get("resultCode", "")),
+            orjson.dumps(raw.get("resultMsg", "")),
+            today_iso.encode(),
+        )
+    return Response(content=content, media_type="application/json")
+
+
 @app.get("/api/health")
-def health():
+async def health():
     return {"ok": True}
 
 
 @app.get("/api/search")
-def search(
-    keyword: str = Query(default="", description="부분검색(업체명/품목/주소/인증번호 등)"),
+async def search(
+    keyword: str = Query(default="", description="부분검색(업체명/품목/주소/인증번호 등, 공백 구분 시 AND)"),
     jisoknm: str = Query(default="", description="인증기관(예: (유)오가닉티앤씨)"),
     force: int = Query(default=0, description="1이면 캐시 무시"),
 ):
-    raw = get_items_cached(force=bool(force))
+    # 요청당 한 번만 계산해서 아래로 전달
+    today = date.today()
+    today_iso = today.isoformat()
+
+    raw = await get_items_cached(force=bool(force))
     if raw.get("resultCode") != "00":
-        return JSONResponse({
-            "resultCode": raw.get("resultCode", ""),
-            "resultMsg": raw.get("resultMsg", ""),
-            "today": date.today().isoformat(),
-            "counts": {"rows_total": 0, "rows_valid": 0, "rows_unknown": 0, "rows_expired": 0, "rows_future": 0},
-            "items": [],
-        }, status_code=200)
+        return _template_response(_SEARCH_ERROR_TMPL, raw, today_iso)
 
-    items: List[Dict[str, Any]] = raw["items"]
+    all_items: List[Item] = raw["items"]
+    jisok_lc: List[str] = raw["jisok_lc"]
+    indices = range(len(all_items))
+
+    jfilter = jisoknm.strip().lower()
+    kfilter = keyword.strip().lower()
 
     # 기관 필터(jisoknm)
-    if jisoknm.strip():
-        k = jisoknm.strip().lower()
-        items = [it for it in items if k in (it.get("jisoknm") or "").lower()]
+    if jfilter:
+        indices = [i for i in indices if jfilter in jisok_lc[i]]
 
-    # keyword 필터
-    if keyword.strip():
-        k = keyword.strip().lower()
-        items = [it for it in items if k in build_haystack(it)]
+    # keyword 필터(공백으로 나눈 토큰은 모두 포함해야 함: AND 검색)
+    tokens = kfilter.split()
+    if tokens:
+        indices = filter_contains(raw, indices, tokens)
 
-    today = date.today()
-    out: List[Dict[str, Any]] = []
-    for it in items:
-        it2 = dict(it)
-        it2["_validity"] = validity_status(it.get("vdatefrom", ""), it.get("vdateto", ""), today=today)
-        it2["vdatefrom_iso"] = format_date_iso(it.get("vdatefrom", ""))
-        it2["vdateto_iso"] = format_date_iso(it.get("vdateto", ""))
-        out.append(it2)
+    if isinstance(indices, range):
+        # 필터 없음: 캐시 컬럼을 복사 없이 그대로 사용
+        vfrom, vto = raw["vfrom_i"], raw["vto_i"]
+    else:
+        idx = np.fromiter(indices, dtype=np.intp, count=len(indices))
+        vfrom, vto = raw["vfrom_i"][idx], raw["vto_i"][idx]
 
-    return {
+    # _validity는 날짜가 바뀌면 달라지므로 캐시하지 않고 요청마다 계산
+    codes = validity_codes(vfrom, vto, today)
+    statuses = VALIDITY_LABELS[codes].tolist()
+
+    out: List[Dict[str, str]] = [all_items[i].to_dict(st) for i, st in zip(indices, statuses)]
+
+    return ORJSONResponse({
         "resultCode": "00",
         "resultMsg": raw.get("resultMsg", "OK"),
-        "today": today.isoformat(),
-        "counts": compute_counts(out),
+        "today": today_iso,
+        "counts": compute_counts(codes),
         "items": out,
+    })
+
+
+def _lookup_expiry(raw: Dict[str, Any], certno: str, jfilter: str, today_ord: int) -> Dict[str, Any]:
+    idxs: List[int] = raw["by_certno"].get(certno.strip(), [])
+
+    # 기관 필터(선택)
+    if jfilter:
+        jisok_lc: List[str] = raw["jisok_lc"]
+        idxs = [i for i in idxs if jfilter in jisok_lc[i]]
+
+    if not idxs:
+        return {"found": False, "item": None}
+
+    # 인덱스가 이미 vdatefrom 최신 우선으로 정렬되어 있음
+    picked: Item = raw["items"][idxs[0]]
+    st = _validity_cached(picked.vdatefrom, picked.vdateto, today_ord)
+    return {
+        "found": True,
+        "validity": st,                     # VALID/EXPIRED/FUTURE/UNKNOWN
+        "expiry_date": picked.vdateto_iso,  # "YYYY-MM-DD" 또는 ""(미기재)
+        "item": picked.to_dict(st),
     }
 
 
 @app.get("/api/expiry")
-def expiry(
+async def expiry(
     certno: str = Query(..., description="인증번호 예: 104-0153"),
     jisoknm: str = Query(default="", description="인증기관(선택) 예: (유)오가닉티앤씨"),
     force: int = Query(default=0, description="1이면 캐시 무시"),
 ):
-    raw = get_items_cached(force=bool(force))
-    if raw.get("resultCode") != "00":
-        return JSONResponse({
-            "resultCode": raw.get("resultCode", ""),
-            "resultMsg": raw.get("resultMsg", ""),
-            "today": date.today().isoformat(),
-            "found": False,
-            "item": None,
-        }, status_code=200)
+    # 요청당 한 번만 계산해서 아래로 전달
+    today = date.today()
+    today_iso = today.isoformat()
+    today_ord = today.toordinal()
 
-    items: List[Dict[str, Any]] = raw["items"]
+    raw = await get_items_cached(force=bool(force))
+    if raw.get("resultCode") != "00":
+        return _template_response(_EXPIRY_ERROR_TMPL, raw, today_iso)
 
-    # 기관 필터(선택)
-    if jisoknm.strip():
-        k = jisoknm.strip().lower()
-        items = [it for it in items if k in (it.get("jisoknm") or "").lower()]
+    found = _lookup_expiry(raw, certno, jisoknm.strip().lower(), today_ord)
+    if not found["found"]:
+        return _template_response(_EXPIRY_NOT_FOUND_TMPL, None, today_iso)
 
-    cno = certno.strip()
-    candidates = [it for it in items if (it.get("certno") or "").strip() == cno]
+    return ORJSONResponse({
+        "resultCode": "00",
+        "resultMsg": "OK",
+        "today": today_iso,
+        **found,
+    })
 
-    if not candidates:
-        return {
-            "resultCode": "00",
-            "resultMsg": "OK",
-            "today": date.today().isoformat(),
-            "found": False,
-            "item": None,
-        }
 
-    # vdatefrom 최신 우선(파싱 가능 날짜 기준)
-    def key_fn(it: Dict[str, Any]) -> date:
-        d = yyyymmdd_to_date(it.get("vdatefrom", ""))
-        return d or date(1900, 1, 1)
+class ExpiryBatchReq(BaseModel):
+    certnos: List[str] = Field(..., max_length=MAX_BATCH_CERTNOS, description="인증번호 목록(최대 500개)")
+    jisoknm: str = Field(default="", description="인증기관(선택, 모든 인증번호에 공통 적용)")
 
-    candidates.sort(key=key_fn, reverse=True)
-    picked = candidates[0]
 
+@app.post("/api/expiry_batch")
+async def expiry_batch(
+    req: ExpiryBatchReq,
+    force: int = Query(default=0, description="1이면 캐시 무시"),
+):
+    """
+    /api/expiry를 여러 인증번호에 대해 한 번에 조회. 결과는 입력 순서와 같고,
+    /api/expiry와 같은 캐시(CACHE_TTL_SECONDS)를 사용한다.
+    """
     today = date.today()
-    st = validity_status(picked.get("vdatefrom", ""), picked.get("vdateto", ""), today=today)
+    today_iso = today.isoformat()
+    today_ord = today.toordinal()
 
-    item = dict(picked)
-    item["_validity"] = st
-    item["vdatefrom_iso"] = format_date_iso(picked.get("vdatefrom", ""))
-    item["vdateto_iso"] = format_date_iso(picked.get("vdateto", ""))
+    raw = await get_items_cached(force=bool(force))
+    if raw.get("resultCode") != "00":
+        return _template_response(_EXPIRY_BATCH_ERROR_TMPL, raw, today_iso)
 
-    return {
+    jfilter = req.jisoknm.strip().lower()
+    return ORJSONResponse({
         "resultCode": "00",
         "resultMsg": "OK",
-        "today": today.isoformat(),
-        "found": True,
-        "validity": st,                     # VALID/EXPIRED/FUTURE/UNKNOWN
-        "expiry_date": item["vdateto_iso"], # "YYYY-MM-DD" 또는 ""(미기재)
-        "item": item,
-    }
+        "today": today_iso,
+        "results": [
+            {"certno": cno, **_lookup_expiry(raw, cno, jfilter, today_ord)}
+            for cno in req.certnos
+        ],
+    })